@@ -1,29 +1,67 @@
 import os
-import sqlite3
-import json
+import time
+import signal
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import aiosqlite
+import httpx
+import anyio.to_thread
+import orjson
+import numpy as np
+from cachetools import LRUCache, TLRUCache
+from concurrent.futures import ProcessPoolExecutor
+from contextvars import ContextVar
+from functools import lru_cache, wraps
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Awaitable, Callable, Dict, List, Literal, Optional
 from fastapi import FastAPI, HTTPException, Request, Depends, status
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from pydantic import BaseModel
-from openai import OpenAI
+from pydantic import BaseModel, Field
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+import jwt
+from init_db import FTS_TABLES, init_db
+from passwords import check_password, hash_password
+from db import db_pool, query_db, execute_db, execute_returning, transaction
+from shared_cache import shared_cache
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-for-jwt-keep-it-safe")
 ALGORITHM = "HS256"
+JWT_KEY = SECRET_KEY.encode()  # encoded once instead of on every sign/verify
+JWT_ALGORITHMS = [ALGORITHM]
+JWT_DECODE_OPTIONS = {"require": ["exp", "sub"]}
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 day
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Dedicated pool so hashing bursts don't starve Starlette's default threadpool
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", "2"))
+HASH_POOL: Optional[ProcessPoolExecutor] = None  # created on startup, shut down on shutdown
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/login")
 
-app = FastAPI()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+app = FastAPI(default_response_class=ORJSONResponse)
+OPENAI_TIMEOUT = httpx.Timeout(30.0, connect=3.0)
+client: Optional[AsyncOpenAI] = None  # created on startup, closed on shutdown
+fts_enabled = True  # set on startup from whether init_db built the FTS tables
+
+def create_openai_client():
+    # One keep-alive HTTP/2 pool per worker, so warm requests skip the TLS handshake
+    http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=OPENAI_TIMEOUT,
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+    )
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        max_retries=2,
+        timeout=OPENAI_TIMEOUT,
+        http_client=http_client,
+    )
 
 # Models
 class User(BaseModel):
@@ -43,8 +81,18 @@ class RegisterRequest(BaseModel):
     username: str
     password: str
 
+MAX_CHAT_MESSAGES = 64
+MAX_MESSAGE_CHARS = 16_000
+
+class ChatMessage(BaseModel):
+    role: Literal["system", "user", "assistant", "tool"]
+    content: Optional[str] = Field(default=None, max_length=MAX_MESSAGE_CHARS)
+    name: Optional[str] = None
+    tool_call_id: Optional[str] = None
+    tool_calls: Optional[list] = None
+
 class ChatRequest(BaseModel):
-    messages: List[dict]
+    messages: List[ChatMessage] = Field(min_length=1, max_length=MAX_CHAT_MESSAGES)
 
 class KnowledgeRequest(BaseModel):
     entity_name: str
@@ -52,31 +100,45 @@ class KnowledgeRequest(BaseModel):
     target_entity: str
     additional_info: str = ""
 
-# Database helpers
-def query_db(query, args=(), one=False):
-    conn = sqlite3.connect('sales.db')
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute(query, args)
-    rv = cur.fetchall()
-    conn.close()
-    return (rv[0] if rv else None) if one else rv
-
-def execute_db(query, args=()):
-    conn = sqlite3.connect('sales.db')
-    cur = conn.cursor()
-    cur.execute(query, args)
-    conn.commit()
-    lastrowid = cur.lastrowid
-    conn.close()
-    return lastrowid
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "100"))
+
+@app.on_event("startup")
+async def startup_event():
+    global client, fts_enabled, HASH_POOL
+    client = create_openai_client()
+    # Separate processes so a hashing burst can't take CPU from this worker's event loop;
+    # spawned, since forking a process that already runs threads is unsafe
+    HASH_POOL = ProcessPoolExecutor(max_workers=HASH_POOL_SIZE, mp_context=multiprocessing.get_context("spawn"))
+    # Sync dependencies (e.g. OAuth2PasswordRequestForm) still run on anyio's threadpool
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    load_index_html()
+    loop = asyncio.get_running_loop()
+    try:
+        # `kill -HUP <worker>` picks up an edited index.html without a restart
+        loop.add_signal_handler(signal.SIGHUP, load_index_html)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        pass  # no SIGHUP (Windows) or the loop isn't on the main thread
+    await loop.run_in_executor(None, init_db)
+    await db_pool.open()
+    tables = {row[0] for row in await query_db("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    fts_enabled = all(f"{table}_fts" in tables for table in FTS_TABLES)
+    await shared_cache.open()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await client.close()
+    await db_pool.close()
+    await shared_cache.close()
+    HASH_POOL.shutdown(wait=False)
 
 # Auth Helpers
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(HASH_POOL, check_password, plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(HASH_POOL, hash_password, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -85,162 +147,715 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, JWT_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Verified token -> user lookups in shared_cache; bump jwt_epoch to drop them all
+# (e.g. password change)
+USER_CACHE_TTL = 300
+jwt_epoch = 0
+
+def user_cache_key(token: str):
+    # Hashed so the shared store never holds a usable bearer token
+    return f"jwt:{jwt_epoch}:" + hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    cached = await shared_cache.get(user_cache_key(token))
+    if cached is not None:
+        return dict(cached)
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, JWT_KEY, algorithms=JWT_ALGORITHMS, options=JWT_DECODE_OPTIONS)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
         token_data = TokenData(username=username)
-    except JWTError:
+    except jwt.InvalidTokenError:
         raise credentials_exception
-    user = query_db("SELECT id, username FROM users WHERE username = ?", (token_data.username,), one=True)
+    user = await query_db(Q_USER_BY_USERNAME, (token_data.username,), one=True)
     if user is None:
         raise credentials_exception
-    return dict(user)
+    user = dict(user)
+    # Never outlive the token itself
+    await shared_cache.set(user_cache_key(token), user, min(USER_CACHE_TTL, payload["exp"] - time.time()))
+    return user
+
+# Time helpers
+@lru_cache(maxsize=1)
+def today_str(day_key: int):
+    """The UTC date of day_key (days since epoch), which only changes once a day."""
+    # Derived from the key itself so a call racing midnight can't cache the wrong date
+    return time.strftime("%Y-%m-%d", time.gmtime(day_key * 86400))
+
+def current_day():
+    return int(time.time()) // 86400
+
+# Hot queries, kept as fixed SQL text so every call hits the prepared-statement cache
+CUSTOMER_COLUMNS = "id, name, email, company, status, last_interaction, next_follow_up, notes, tags"
+# List views only carry what the model needs to pick a customer; details has the rest
+CUSTOMER_SEARCH_COLUMNS = "id, name, company, notes, next_follow_up"
+FOLLOW_UP_LIMIT = 50
+KB_COLUMNS = "id, entity_name, relation, target_entity, additional_info, created_at"
+
+Q_USER_BY_USERNAME = "SELECT id, username FROM users WHERE username = ?"
+Q_GET_CUSTOMERS = f"SELECT {CUSTOMER_SEARCH_COLUMNS} FROM customers WHERE user_id = ?"
+Q_GET_CUSTOMER = f"SELECT {CUSTOMER_COLUMNS} FROM customers WHERE user_id = ?1 AND id = ?2"
+Q_URGENT_FOLLOW_UPS = f"""
+    SELECT {CUSTOMER_SEARCH_COLUMNS} FROM customers
+    WHERE user_id = ?1 AND next_follow_up IS NOT NULL AND next_follow_up <= ?2
+    ORDER BY next_follow_up LIMIT {FOLLOW_UP_LIMIT}
+"""
+Q_SEARCH_CUSTOMERS = f"""
+    SELECT {', '.join('c.' + c for c in CUSTOMER_SEARCH_COLUMNS.split(', '))}
+    -- CROSS JOIN pins the FTS index as the outer loop: O(matches), not O(rows)
+    FROM customers_fts f CROSS JOIN customers c ON c.id = f.rowid
+    WHERE c.user_id = ?1 AND customers_fts MATCH ?2
+    ORDER BY f.rank
+"""
+Q_LIST_KNOWLEDGE = f"SELECT {KB_COLUMNS} FROM knowledge_base WHERE user_id = ?"
+# Newest knowledge id; every write moves it, so answers keyed on it go stale at once
+Q_KNOWLEDGE_GENERATION = "SELECT MAX(id) FROM knowledge_base WHERE user_id = ?"
+Q_SEARCH_KNOWLEDGE = f"""
+    SELECT {', '.join('k.' + c for c in KB_COLUMNS.split(', '))}
+    FROM knowledge_base_fts f CROSS JOIN knowledge_base k ON k.id = f.rowid
+    WHERE k.user_id = ?1 AND knowledge_base_fts MATCH ?2
+    ORDER BY f.rank
+"""
+
+def like_scan(columns: str, table: str):
+    """Substring search over the FTS columns, binding the pattern once as ?2."""
+    matches = " OR ".join(f"{c} LIKE ?2 ESCAPE '\\'" for c in FTS_TABLES[table])
+    return f"SELECT {columns} FROM {table} WHERE user_id = ?1 AND ({matches})"
+
+# Used instead of the FTS queries when SQLite was built without FTS5
+Q_LIKE_CUSTOMERS = like_scan(CUSTOMER_SEARCH_COLUMNS, "customers")
+Q_LIKE_KNOWLEDGE = like_scan(KB_COLUMNS, "knowledge_base")
+
+def tabular(rows):
+    """Column names once plus the raw rows; json_default encodes each row as an array."""
+    return {"columns": list(rows[0].keys()) if rows else [], "rows": rows}
+
+def json_default(obj):
+    if isinstance(obj, aiosqlite.Row):
+        return tuple(obj)
+    return str(obj)
+
+# Per-user read cache, dropped for a user whenever they write
+READ_CACHE_TTL = 10
+READ_CACHE_LOW = 1000
+READ_CACHE_HIGH = 5000
+
+def pressure_scale(size: int, low: int, high: int):
+    """TTL multiplier: 1 up to `low` entries, shrinking linearly to 0.1 at `high`."""
+    pressure = min(1.0, max(0.0, (size - low) / (high - low)))
+    return max(0.1, 1 - pressure)
+
+def read_cache_ttu(key, value, now):
+    return now + READ_CACHE_TTL * pressure_scale(len(READ_CACHE), READ_CACHE_LOW, READ_CACHE_HIGH)
+
+READ_CACHE: TLRUCache = TLRUCache(maxsize=READ_CACHE_HIGH, ttu=read_cache_ttu)
+
+# knowledge_generation() the current chat turn runs under. It is part of every
+# READ_CACHE key, so a result cached before a write made on another worker (whose
+# invalidate_reads can't reach this process) is never reused after it
+read_generation: ContextVar = ContextVar("read_generation", default=None)
+
+def cached_read(fn):
+    @wraps(fn)
+    async def wrapper(user_id: int, *args):
+        key = (user_id, read_generation.get(), fn.__name__, *args)
+        try:
+            return READ_CACHE[key]
+        except KeyError:
+            pass
+        rv = await fn(user_id, *args)
+        READ_CACHE[key] = rv
+        return rv
+    return wrapper
+
+def invalidate_reads(user_id: int):
+    for key in [k for k in list(READ_CACHE.keys()) if k[0] == user_id]:
+        READ_CACHE.pop(key, None)
+
+async def invalidate_answers(user_id: int):
+    """Drop the user's cached chat answers, which may quote data that just changed.
+
+    Exact-match entries in shared_cache need no delete: their key carries
+    knowledge_generation(), which the write has already moved.
+    """
+    await execute_db("DELETE FROM chat_cache WHERE user_id = ?", (user_id,))
+
+async def knowledge_generation(user_id: int):
+    row = await query_db(Q_KNOWLEDGE_GENERATION, (user_id,), one=True)
+    return row[0] or 0
 
 # Tool Functions with user_id
-def get_customers(user_id: int):
-    rows = query_db('SELECT * FROM customers WHERE user_id = ?', (user_id,))
-    return [dict(row) for row in rows]
-
-def search_customers(user_id: int, query: str):
-    rows = query_db("SELECT * FROM customers WHERE user_id = ? AND (name LIKE ? OR company LIKE ? OR notes LIKE ?)", 
-                   (user_id, f'%{query}%', f'%{query}%', f'%{query}%'))
-    return [dict(row) for row in rows]
-
-def get_urgent_follow_ups(user_id: int):
-    now = datetime.now().isoformat()
-    two_days_later = (datetime.now() + timedelta(days=2)).isoformat()
-    rows = query_db("SELECT * FROM customers WHERE user_id = ? AND next_follow_up IS NOT NULL AND next_follow_up <= ?", 
-                   (user_id, two_days_later))
-    return [dict(row) for row in rows]
-
-def get_customer_details(user_id: int, customer_id: int):
-    row = query_db("SELECT * FROM customers WHERE user_id = ? AND id = ?", (user_id, customer_id), one=True)
+@cached_read
+async def get_customers(user_id: int):
+    rows = await query_db(Q_GET_CUSTOMERS, (user_id,))
+    return tabular(rows)
+
+def fts_query(query: str):
+    """Turn free text into an FTS5 prefix query, quoting each term."""
+    terms = [t.replace('"', '""') for t in (query or "").split()]
+    return " ".join(f'"{t}"*' for t in terms if t)
+
+def like_pattern(query: str):
+    text = (query or "").strip()
+    for ch in "\\%_":
+        text = text.replace(ch, "\\" + ch)
+    return f"%{text}%" if text else ""
+
+@cached_read
+async def search_customers(user_id: int, query: str):
+    match = fts_query(query) if fts_enabled else like_pattern(query)
+    if not match:
+        rows = await query_db(Q_GET_CUSTOMERS, (user_id,))
+    else:
+        rows = await query_db(Q_SEARCH_CUSTOMERS if fts_enabled else Q_LIKE_CUSTOMERS, (user_id, match))
+    return tabular(rows)
+
+@cached_read
+async def get_urgent_follow_ups(user_id: int):
+    two_days_later = (datetime.now() + timedelta(days=2)).isoformat(timespec="seconds")
+    rows = await query_db(Q_URGENT_FOLLOW_UPS, (user_id, two_days_later))
+    return tabular(rows)
+
+@cached_read
+async def get_customer_details(user_id: int, customer_id: int):
+    row = await query_db(Q_GET_CUSTOMER, (user_id, customer_id), one=True)
     return dict(row) if row else None
 
-def add_to_knowledge_base(user_id: int, entity_name: str, relation: str, target_entity: str, additional_info: str = ""):
-    new_id = execute_db('''
+async def add_to_knowledge_base(user_id: int, entity_name: str, relation: str, target_entity: str, additional_info: str = ""):
+    new_id = await execute_db('''
         INSERT INTO knowledge_base (user_id, entity_name, relation, target_entity, additional_info)
         VALUES (?, ?, ?, ?, ?)
     ''', (user_id, entity_name, relation, target_entity, additional_info))
+    invalidate_reads(user_id)
+    await invalidate_answers(user_id)
     return {"status": "success", "id": new_id}
 
-def query_knowledge_base(user_id: int, query: str):
-    rows = query_db("SELECT * FROM knowledge_base WHERE user_id = ? AND (entity_name LIKE ? OR relation LIKE ? OR target_entity LIKE ? OR additional_info LIKE ?)", 
-                   (user_id, f'%{query}%', f'%{query}%', f'%{query}%', f'%{query}%'))
-    return [dict(row) for row in rows]
-
-# AI Tools Definition
-def get_tools_definition():
-    return [
-        {
-            "type": "function",
-            "function": {
-                "name": "get_customers",
-                "description": "Get all customers in the database",
-                "parameters": {"type": "object", "properties": {}}
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "search_customers",
-                "description": "Search for customers by name, company, or notes",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "query": {"type": "string", "description": "The search query"}
-                    },
-                    "required": ["query"]
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "get_urgent_follow_ups",
-                "description": "Get customers who need a follow-up soon",
-                "parameters": {"type": "object", "properties": {}}
+async def add_knowledge_entries(user_id: int, entries: List[dict]):
+    """Record several add_to_knowledge_base calls with one multi-row INSERT."""
+    values = ", ".join(["(?, ?, ?, ?, ?)"] * len(entries))
+    params = [
+        value
+        for a in entries
+        for value in (user_id, a.get("entity_name"), a.get("relation"),
+                      a.get("target_entity"), a.get("additional_info", ""))
+    ]
+    rows = await execute_returning(f'''
+        INSERT INTO knowledge_base (user_id, entity_name, relation, target_entity, additional_info)
+        VALUES {values} RETURNING id
+    ''', params)
+    invalidate_reads(user_id)
+    await invalidate_answers(user_id)
+    # Rowids are handed out in VALUES order, whatever order RETURNING emits them in
+    return [{"status": "success", "id": new_id} for new_id in sorted(row[0] for row in rows)]
+
+@cached_read
+async def query_knowledge_base(user_id: int, query: str):
+    match = fts_query(query) if fts_enabled else like_pattern(query)
+    if not match:
+        rows = await query_db(Q_LIST_KNOWLEDGE, (user_id,))
+    else:
+        rows = await query_db(Q_SEARCH_KNOWLEDGE if fts_enabled else Q_LIKE_KNOWLEDGE, (user_id, match))
+    return tabular(rows)
+
+async def unknown_tool(user_id: int, args: dict):
+    return {"error": "Unknown function"}
+
+# Reported to the model for a call whose arguments don't fit the tool's parameters
+INVALID_ARGUMENTS = {"error": "invalid arguments"}
+SCALAR_TYPES = (str, int, float, bool)
+
+def parse_arguments(name: str, raw: str):
+    """A tool call's arguments as a dict, or None if they can't be bound as given.
+
+    That is: not a JSON object, a required parameter missing or null, or a value
+    SQLite can't bind. One such write would otherwise fail its whole batch.
+    """
+    try:
+        args = orjson.loads(raw or "{}")
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(args, dict):
+        return None
+    if any(args.get(k) is None for k in REQUIRED_ARGUMENTS.get(name, ())):
+        return None
+    if not all(v is None or isinstance(v, SCALAR_TYPES) for v in args.values()):
+        return None
+    return args
+
+async def invalid_arguments():
+    return INVALID_ARGUMENTS
+
+# Tools that write, mapped to a batch taking (user_id, every call's arguments).
+# These run after the planning stream inside one transaction.
+WRITE_TOOLS: Dict[str, Callable[[int, List[dict]], Awaitable[list]]] = {
+    "add_to_knowledge_base": add_knowledge_entries,
+}
+
+# Maps a tool name to a coroutine factory taking (user_id, parsed arguments)
+TOOL_DISPATCH: Dict[str, Callable[[int, dict], Awaitable]] = {
+    "get_customers": lambda uid, a: get_customers(uid),
+    "search_customers": lambda uid, a: search_customers(uid, a.get("query")),
+    "get_urgent_follow_ups": lambda uid, a: get_urgent_follow_ups(uid),
+    "get_customer_details": lambda uid, a: get_customer_details(uid, a.get("customer_id")),
+    "add_to_knowledge_base": lambda uid, a: add_to_knowledge_base(
+        uid,
+        a.get("entity_name"),
+        a.get("relation"),
+        a.get("target_entity"),
+        a.get("additional_info", "")
+    ),
+    "query_knowledge_base": lambda uid, a: query_knowledge_base(uid, a.get("query")),
+}
+
+# AI Tools Definition; a tuple since this one object is shared by every request
+TOOLS_DEFINITION = (
+    {
+        "type": "function",
+        "function": {
+            "name": "get_customers",
+            "description": "Get all customers in the database",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_customers",
+            "description": "Search for customers by name, company, or notes",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "The search query"}
+                },
+                "required": ["query"]
             }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "get_customer_details",
-                "description": "Get detailed information about a specific customer",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "customer_id": {"type": "integer", "description": "The customer ID"}
-                    },
-                    "required": ["customer_id"]
-                }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_urgent_follow_ups",
+            "description": "Get customers who need a follow-up soon",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_customer_details",
+            "description": "Get detailed information about a specific customer",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "customer_id": {"type": "integer", "description": "The customer ID"}
+                },
+                "required": ["customer_id"]
             }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "add_to_knowledge_base",
-                "description": "Add a new fact or piece of information to the knowledge base",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "entity_name": {"type": "string", "description": "The subject"},
-                        "relation": {"type": "string", "description": "The relationship"},
-                        "target_entity": {"type": "string", "description": "The object"},
-                        "additional_info": {"type": "string", "description": "Extra context"}
-                    },
-                    "required": ["entity_name", "relation", "target_entity"]
-                }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "add_to_knowledge_base",
+            "description": "Add a new fact or piece of information to the knowledge base",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "entity_name": {"type": "string", "description": "The subject"},
+                    "relation": {"type": "string", "description": "The relationship"},
+                    "target_entity": {"type": "string", "description": "The object"},
+                    "additional_info": {"type": "string", "description": "Extra context"}
+                },
+                "required": ["entity_name", "relation", "target_entity"]
             }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "query_knowledge_base",
-                "description": "Search for specific facts in the knowledge base",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "query": {"type": "string", "description": "The search term"}
-                    },
-                    "required": ["query"]
-                }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "query_knowledge_base",
+            "description": "Search for specific facts in the knowledge base",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "The search term"}
+                },
+                "required": ["query"]
             }
         }
-    ]
+    }
+)
+
+# Every advertised tool must be dispatchable
+assert {t["function"]["name"] for t in TOOLS_DEFINITION} == set(TOOL_DISPATCH)
+
+REQUIRED_ARGUMENTS = {
+    t["function"]["name"]: tuple(t["function"]["parameters"].get("required", ()))
+    for t in TOOLS_DEFINITION
+}
+
+# System prompt
+SYSTEM_PROMPT_TMPL = """You are a helpful sales assistant for user {u}.
+            You have access to their customer database and knowledge base (knowledge graph).
+            
+            CRITICAL GOAL: Proactively build and manage the customer knowledge graph. 
+            When the user mentions a fact about a customer, company, or relationship (e.g., "Alice prefers Slack", "TechCorp is located in SF", "Bob is interested in the Pro plan"), 
+            IMMEDIATELY use the `add_to_knowledge_base` tool to record it. 
+            Do not wait for the user to explicitly ask you to "save" it—if it's a useful fact, record it.
+            
+            When drafting messages or providing advice, ALWAYS check the knowledge base first using `query_knowledge_base` to provide the most personalized assistance.
+            
+            Today's date is {d}.
+            Always ensure you are only accessing and managing data for the current user."""
+
+@lru_cache(maxsize=1024)
+def system_prompt(user_id: int, username: str, day: int):
+    return SYSTEM_PROMPT_TMPL.format(u=username, d=today_str(day))
+
+# Response caches
+SEMANTIC_CACHE_THRESHOLD = 0.95
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Under the model's 8,191-token input limit even at one token per character
+EMBED_MAX_CHARS = 8000
+
+# Cached answers expire by query class, then shrink further as chat_cache grows
+CACHE_TTLS = {"time_sensitive": 60, "semi_dynamic": 3600, "evergreen": 86400}
+MAX_CACHE_TTL = max(CACHE_TTLS.values())
+CHAT_CACHE_LOW = 5000
+CHAT_CACHE_HIGH = 20000
+TIME_SENSITIVE_KEYWORDS = ("follow up", "follow-up", "followup", "today", "tomorrow", "urgent", "this week", "overdue")
+EVERGREEN_KEYWORDS = ("draft", "how do i", "how should i", "template", "phrase", "wording")
+
+def classify_query(text: str):
+    text = text.lower()
+    # Checked first: serving these stale is worse than missing an evergreen hit
+    if any(k in text for k in TIME_SENSITIVE_KEYWORDS):
+        return "time_sensitive"
+    if any(k in text for k in EVERGREEN_KEYWORDS):
+        return "evergreen"
+    return "semi_dynamic"
+
+SEMANTIC_CACHE_CANDIDATES = 256
+NOCACHE_COMMAND = "!nocache"
+
+Q_SEMANTIC_CANDIDATES = """
+    SELECT embedding, last_embedding, response FROM chat_cache
+    WHERE user_id = ?1 AND prompt_hash = ?2 AND created_at >= ?3 AND created_at + ttl_seconds >= ?4
+    ORDER BY created_at DESC LIMIT ?5
+"""
+
+def similarity(rows, column: str, vector):
+    matrix = np.frombuffer(b"".join(row[column] for row in rows), dtype=np.float32)
+    return matrix.reshape(len(rows), -1) @ vector
+
+async def semantic_lookup(user_id: int, prompt_hash: str, vectors):
+    """Closest fresh cached answer for this user and system prompt, if similar enough.
+
+    `vectors` embeds (every user turn, the last user message); both must clear the
+    threshold, so a long shared history can't carry a different final question.
+    """
+    now = time.time()
+    rows = await query_db(Q_SEMANTIC_CANDIDATES, (
+        user_id, prompt_hash, now - MAX_CACHE_TTL, now, SEMANTIC_CACHE_CANDIDATES
+    ))
+    if not rows:
+        return None
+    scores = np.minimum(similarity(rows, "embedding", vectors[0]),
+                        similarity(rows, "last_embedding", vectors[1]))
+    best = int(scores.argmax())
+    return rows[best]["response"] if scores[best] >= SEMANTIC_CACHE_THRESHOLD else None
+
+async def cache_ttl(category: str):
+    size = (await query_db("SELECT COUNT(*) FROM chat_cache", one=True))[0]
+    return CACHE_TTLS[category] * pressure_scale(size, CHAT_CACHE_LOW, CHAT_CACHE_HIGH)
+
+async def semantic_store(user_id: int, prompt_hash: str, vectors, answer: str, category: str, ttl: float):
+    now = time.time()
+    async with transaction():
+        await execute_db("DELETE FROM chat_cache WHERE user_id = ? AND created_at + ttl_seconds < ?",
+                         (user_id, now))
+        await execute_db('''
+            INSERT INTO chat_cache (user_id, prompt_hash, embedding, last_embedding, response, category, ttl_seconds, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, prompt_hash, vectors[0].tobytes(), vectors[1].tobytes(), answer, category, ttl, now))
+
+def pop_nocache(messages: list):
+    """Strip a leading !nocache from the last user message; True if it was there."""
+    last = messages[-1]
+    content = last.get("content") or ""
+    if last["role"] != "user" or not content.startswith(NOCACHE_COMMAND):
+        return False
+    last["content"] = content[len(NOCACHE_COMMAND):].lstrip()
+    return True
+
+# Both cache keys fold in knowledge_generation(), so no answer outlives a later write
+def chat_cache_key(user_id: int, generation: int, messages: list):
+    payload = orjson.dumps([user_id, generation, messages], option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+def prompt_hash(messages: list, generation: int):
+    payload = f"{generation}:{messages[0].get('content') or ''}"
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+async def embed(texts: List[str]):
+    """Unit-length embeddings, one row per text, from a single API call.
+
+    Each text keeps only its last EMBED_MAX_CHARS characters, the most recent turns.
+    """
+    response = await client.embeddings.create(
+        model=EMBEDDING_MODEL, input=[t[-EMBED_MAX_CHARS:] for t in texts]
+    )
+    matrix = np.asarray([d.embedding for d in response.data], dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+# Conversation window: older turns are folded into one summary message
+SUMMARY_MODEL = "gpt-4o-mini"
+SUMMARY_MAX_TOKENS = 300
+HISTORY_MAX_MESSAGES = 20
+HISTORY_MAX_CHARS = 8000
+HISTORY_KEEP_RECENT = 8
+HISTORY_SUMMARY_STEP = 4  # the cut moves in steps so one summary serves several turns
+
+# Summaries by hash of the turns they cover; the same prefix recurs every turn
+SUMMARY_CACHE: LRUCache = LRUCache(maxsize=2000)
+
+def history_cut(history: list):
+    """Index splitting `history` into summarized and verbatim parts; 0 keeps it all."""
+    chars = sum(len(m.get("content") or "") for m in history)
+    if len(history) <= HISTORY_MAX_MESSAGES and chars <= HISTORY_MAX_CHARS:
+        return 0
+    cut = (len(history) - HISTORY_KEEP_RECENT) // HISTORY_SUMMARY_STEP * HISTORY_SUMMARY_STEP
+    # Too few messages to leave HISTORY_KEEP_RECENT verbatim (e.g. one huge message)
+    if cut <= 0:
+        return 0
+    # Start the kept window on a user turn so no tool reply loses its tool_calls
+    while 0 < cut < len(history) and history[cut]["role"] != "user":
+        cut -= 1
+    return cut
+
+async def summarize(older: list):
+    transcript = "\n".join(f'{m["role"]}: {m.get("content") or ""}' for m in older)
+    key = hashlib.blake2b(transcript.encode(), digest_size=16).digest()
+    summary = SUMMARY_CACHE.get(key)
+    if summary is None:
+        response = await client.chat.completions.create(
+            model=SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": "Summarize for context:"},
+                {"role": "user", "content": transcript},
+            ],
+            max_tokens=SUMMARY_MAX_TOKENS,
+            temperature=0,
+        )
+        summary = SUMMARY_CACHE[key] = response.choices[0].message.content or ""
+    return summary
+
+async def compact_history(messages: list):
+    """Keep the system prompt and recent turns, replacing older ones with a summary."""
+    system, history = messages[:1], messages[1:]
+    cut = history_cut(history)
+    if not cut:
+        return messages
+    summary = await summarize(history[:cut])
+    return system + [{"role": "system", "content": "Prior context: " + summary}] + history[cut:]
+
+# Chat streaming helpers
+FINAL_MAX_TOKENS = int(os.getenv("FINAL_MAX_TOKENS", "800"))
+
+def sse_event(text: str):
+    return b"data: " + orjson.dumps(text) + b"\n\n"
+
+# Keep intermediaries (browser cache, nginx-style proxies) from buffering the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def event_stream(events):
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+def sse_reply(text: str):
+    """A complete chat reply sent as a single event, e.g. for cache hits."""
+    return event_stream(iter([sse_event(text)]))
+
+def start_ready_tools(calls: dict, tasks: dict, memo: dict, user_id: int, final: bool = False):
+    """Launch every accumulated read-only tool call whose arguments parse as complete JSON.
+
+    Calls repeating an earlier (name, arguments) pair in the same turn share its task.
+    Once the stream has ended (`final`), unparseable arguments get an error result.
+    """
+    for index, call in calls.items():
+        if index in tasks or not call["name"] or call["name"] in WRITE_TOOLS:
+            continue
+        key = (call["name"], call["arguments"])
+        if key in memo:
+            tasks[index] = memo[key]
+            continue
+        args = parse_arguments(call["name"], call["arguments"])
+        if args is None:
+            if not final:
+                continue
+            coro = invalid_arguments()
+        else:
+            coro = TOOL_DISPATCH.get(call["name"], unknown_tool)(user_id, args)
+        tasks[index] = memo[key] = asyncio.create_task(coro)
+
+async def chat_events(messages: list, user_id: int, generation: int,
+                      remember: Optional[Callable[[str], Awaitable]] = None):
+    # Inherited by the tool tasks created below
+    read_generation.set(generation)
+    stream = await client.chat.completions.create(
+        model="gpt-4-turbo-preview",
+        messages=messages,
+        tools=TOOLS_DEFINITION,
+        tool_choice="auto",
+        stream=True
+    )
+
+    content = ""
+    calls = {}  # tool call index -> accumulated id/name/arguments
+    tasks = {}  # tool call index -> running dispatch task
+    memo = {}   # (name, raw arguments) -> task or result, deduplicating this turn
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content += delta.content
+            yield sse_event(delta.content)
+        for fragment in delta.tool_calls or []:
+            call = calls.setdefault(fragment.index, {"id": None, "name": "", "arguments": ""})
+            if fragment.id:
+                call["id"] = fragment.id
+            if fragment.function:
+                call["name"] += fragment.function.name or ""
+                call["arguments"] += fragment.function.arguments or ""
+        if delta.tool_calls:
+            start_ready_tools(calls, tasks, memo, user_id)
+
+    if not calls:
+        if remember is not None and content:
+            await remember(content)
+        return
+
+    start_ready_tools(calls, tasks, memo, user_id, final=True)
+    order = sorted(calls)
+    results = {}
+    writes = [i for i in order if i not in tasks]
+    if writes:
+        batches = {}  # tool name -> {(name, raw arguments): parsed arguments}
+        for i in writes:
+            key = (calls[i]["name"], calls[i]["arguments"])
+            if key not in memo:
+                args = parse_arguments(key[0], key[1])
+                if args is None:
+                    memo[key] = INVALID_ARGUMENTS
+                else:
+                    batches.setdefault(key[0], {})[key] = args
+        try:
+            # Every write of this turn shares one transaction, so one commit
+            if batches:
+                async with transaction():
+                    for name, batch in batches.items():
+                        memo.update(zip(batch, await WRITE_TOOLS[name](user_id, list(batch.values()))))
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        for i in writes:
+            results[i] = memo[(calls[i]["name"], calls[i]["arguments"])]
+    # A failing read is reported to the model instead of aborting the other reads
+    gathered = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    for i, result in zip(tasks, gathered):
+        results[i] = {"error": str(result)} if isinstance(result, Exception) else result
+    if writes:
+        # Only now has every concurrent read stored its result: drop any that ran
+        # their SQL before the commit landed
+        invalidate_reads(user_id)
+
+    messages.append({
+        "role": "assistant",
+        "content": content or None,
+        "tool_calls": [
+            {
+                "id": calls[i]["id"],
+                "type": "function",
+                "function": {"name": calls[i]["name"], "arguments": calls[i]["arguments"]}
+            }
+            for i in order
+        ]
+    })
+    for i in order:
+        messages.append({
+            "tool_call_id": calls[i]["id"],
+            "role": "tool",
+            "name": calls[i]["name"],
+            "content": orjson.dumps(results[i], default=json_default).decode()
+        })
+
+    final_stream = await client.chat.completions.create(
+        model="gpt-4-turbo-preview",
+        messages=messages,
+        max_tokens=FINAL_MAX_TOKENS,
+        temperature=0.2,
+        stream=True
+    )
+    answer = ""
+    async for chunk in final_stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            answer += chunk.choices[0].delta.content
+            yield sse_event(chunk.choices[0].delta.content)
+
+    # Replaying a turn that wrote to the knowledge base would silently skip the write
+    if remember is not None and answer and not writes:
+        await remember(answer)
 
 # Auth Routes
 @app.post("/api/register")
 async def register(req: RegisterRequest):
-    user = query_db("SELECT id FROM users WHERE username = ?", (req.username,), one=True)
+    user = await query_db("SELECT id FROM users WHERE username = ?", (req.username,), one=True)
     if user:
         throw_error = HTTPException(status_code=400, detail="Username already registered")
         raise throw_error
     
-    hashed_password = get_password_hash(req.password)
-    execute_db("INSERT INTO users (username, hashed_password) VALUES (?, ?)", (req.username, hashed_password))
+    hashed_password = await get_password_hash(req.password)
+    await execute_db("INSERT INTO users (username, hashed_password) VALUES (?, ?)", (req.username, hashed_password))
     return {"status": "success", "message": "User created"}
 
+# Login attempts per username in shared_cache; a successful login clears the count
+LOGIN_MAX_FAILURES = 5
+LOGIN_FAILURE_WINDOW = 60
+
+def login_failure_key(username: str):
+    return "login_fail:" + username
+
 @app.post("/api/login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = query_db("SELECT * FROM users WHERE username = ?", (form_data.username,), one=True)
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    # Refuse before touching the hash so credential stuffing can't burn HASH_POOL.
+    # Every attempt reserves its slot up front, so parallel attempts can't all
+    # read a count under the limit; a successful login hands the slot back.
+    failure_key = login_failure_key(form_data.username)
+    if await shared_cache.incr(failure_key, LOGIN_FAILURE_WINDOW) > LOGIN_MAX_FAILURES:
+        _, retry_after = await shared_cache.counter(failure_key)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(max(1, int(retry_after)))},
+        )
+    user = await query_db("SELECT * FROM users WHERE username = ?", (form_data.username,), one=True)
+    if not user or not await verify_password(form_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    await shared_cache.delete(failure_key)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user["username"]}, expires_delta=access_token_expires
@@ -250,104 +865,95 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 # Protected Chat and Knowledge Routes
 @app.post("/api/chat")
 async def chat(request: ChatRequest, current_user: dict = Depends(get_current_user)):
-    messages = request.messages
+    messages = [m.model_dump(exclude_none=True) for m in request.messages]
+    bypass_cache = pop_nocache(messages)
     user_id = current_user["id"]
+
+    # Nothing for the model to answer; skip the LLM and DB entirely
+    if not any(m["role"] == "user" and (m.get("content") or "").strip() for m in messages):
+        return sse_reply("(empty input)")
     
-    if not any(m["role"] == "system" for m in messages):
+    if messages[0].get("role") != "system":
         messages.insert(0, {
             "role": "system",
-            "content": f"""You are a helpful sales assistant for user {current_user['username']}.
-            You have access to their customer database and knowledge base (knowledge graph).
-            
-            CRITICAL GOAL: Proactively build and manage the customer knowledge graph. 
-            When the user mentions a fact about a customer, company, or relationship (e.g., "Alice prefers Slack", "TechCorp is located in SF", "Bob is interested in the Pro plan"), 
-            IMMEDIATELY use the `add_to_knowledge_base` tool to record it. 
-            Do not wait for the user to explicitly ask you to "save" it—if it's a useful fact, record it.
-            
-            When drafting messages or providing advice, ALWAYS check the knowledge base first using `query_knowledge_base` to provide the most personalized assistance.
-            
-            Today's date is {datetime.now().strftime("%Y-%m-%d")}.
-            Always ensure you are only accessing and managing data for the current user."""
+            "content": system_prompt(user_id, current_user["username"], current_day())
         })
 
-    response = client.chat.completions.create(
-        model="gpt-4-turbo-preview",
-        messages=messages,
-        tools=get_tools_definition(),
-        tool_choice="auto"
-    )
-
-    response_message = response.choices[0].message
-    tool_calls = response_message.tool_calls
-
-    if tool_calls:
-        messages.append(response_message)
-        for tool_call in tool_calls:
-            function_name = tool_call.function.name
-            function_args = json.loads(tool_call.function.arguments)
-            
-            if function_name == "get_customers":
-                content = get_customers(user_id)
-            elif function_name == "search_customers":
-                content = search_customers(user_id, function_args.get("query"))
-            elif function_name == "get_urgent_follow_ups":
-                content = get_urgent_follow_ups(user_id)
-            elif function_name == "get_customer_details":
-                content = get_customer_details(user_id, function_args.get("customer_id"))
-            elif function_name == "add_to_knowledge_base":
-                content = add_to_knowledge_base(
-                    user_id,
-                    function_args.get("entity_name"),
-                    function_args.get("relation"),
-                    function_args.get("target_entity"),
-                    function_args.get("additional_info", "")
-                )
-            elif function_name == "query_knowledge_base":
-                content = query_knowledge_base(user_id, function_args.get("query"))
-            else:
-                content = {"error": "Unknown function"}
-
-            messages.append({
-                "tool_call_id": tool_call.id,
-                "role": "tool",
-                "name": function_name,
-                "content": json.dumps(content)
-            })
-        
-        final_response = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=messages
-        )
-        return JSONResponse(content={"message": final_response.choices[0].message.content})
-    
-    return JSONResponse(content={"message": response_message.content})
+    generation = await knowledge_generation(user_id)
+    key = chat_cache_key(user_id, generation, messages)
+    p_hash = prompt_hash(messages, generation)
+    user_messages = [m.get("content") or "" for m in messages if m["role"] == "user"]
+    embed_texts = ["\n".join(user_messages), user_messages[-1]]
+    vectors = None
+    if not bypass_cache:
+        # Exact-match layer in shared_cache, ahead of the semantic lookup
+        cached = await shared_cache.get("chat:" + key)
+        if cached is None:
+            # The semantic layer is an optimization; if it fails, answer uncached
+            try:
+                vectors = await embed(embed_texts)
+                cached = await semantic_lookup(user_id, p_hash, vectors)
+            except Exception:
+                logger.warning("semantic cache lookup failed", exc_info=True)
+        if cached is not None:
+            return sse_reply(cached)
+
+    async def remember(answer: str):
+        # Runs after the last event; a failure here must not cut the stream short
+        try:
+            category = classify_query(user_messages[-1])
+            ttl = await cache_ttl(category)
+            await shared_cache.set("chat:" + key, answer, ttl)
+            embedded = vectors if vectors is not None else await embed(embed_texts)
+            await semantic_store(user_id, p_hash, embedded, answer, category, ttl)
+        except Exception:
+            logger.warning("storing chat answer in cache failed", exc_info=True)
+
+    messages = await compact_history(messages)
+    return event_stream(chat_events(messages, user_id, generation, remember))
 
 @app.post("/api/knowledge")
 async def api_add_knowledge(request: KnowledgeRequest, current_user: dict = Depends(get_current_user)):
-    result = add_to_knowledge_base(
+    result = await add_to_knowledge_base(
         current_user["id"],
         request.entity_name,
         request.relation,
         request.target_entity,
         request.additional_info
     )
-    return JSONResponse(content=result)
+    return result
 
 @app.get("/api/me")
 async def get_me(current_user: dict = Depends(get_current_user)):
     return current_user
 
 # Static Routes
-@app.get("/", response_class=HTMLResponse)
-async def get_root():
-    with open("index.html", "r") as f:
-        return f.read()
-
-@app.get("/index.html", response_class=HTMLResponse)
-async def get_index_html():
-    with open("index.html", "r") as f:
-        return f.read()
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+INDEX_PATH = "index.html"
+INDEX_HTML = b""
+INDEX_ETAG = ""
+INDEX_MTIME = 0.0
+
+def load_index_html():
+    """(Re)read index.html into memory; a no-op while its mtime is unchanged."""
+    global INDEX_HTML, INDEX_ETAG, INDEX_MTIME
+    mtime = os.stat(INDEX_PATH).st_mtime
+    if mtime == INDEX_MTIME:
+        return
+    with open(INDEX_PATH, "rb") as f:
+        INDEX_HTML = f.read()
+    INDEX_MTIME = mtime
+    INDEX_ETAG = '"%s"' % hashlib.blake2b(INDEX_HTML, digest_size=16).hexdigest()
+
+def serve_index(request: Request):
+    headers = {"ETag": INDEX_ETAG, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == INDEX_ETAG:
+        return Response(status_code=304, headers=headers)
+    return Response(INDEX_HTML, media_type="text/html", headers=headers)
+
+@app.get("/")
+async def get_root(request: Request):
+    return serve_index(request)
+
+@app.get("/index.html")
+async def get_index_html(request: Request):
+    return serve_index(request)
@@ -0,0 +1,117 @@
+import os
+import asyncio
+import aiosqlite
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+from init_db import DB_PATH
+
+DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA wal_autocheckpoint=1000",
+    "PRAGMA foreign_keys=ON",
+)
+
+async def open_db():
+    # A larger per-connection statement cache keeps the app's hot queries prepared
+    conn = await aiosqlite.connect(DB_PATH, cached_statements=512)
+    conn.row_factory = aiosqlite.Row
+    for pragma in DB_PRAGMAS:
+        await conn.execute(pragma)
+    return conn
+
+class SqlitePool:
+    """Round-robin pool of reader connections plus a single locked writer."""
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = size
+        self.readers = None
+        self.writer_conn = None
+        self.write_lock = None
+
+    async def open(self):
+        # Read here so a .env loaded after import still applies
+        if self.size is None:
+            self.size = int(os.getenv("DB_POOL_SIZE", "4"))
+        # Created here rather than in __init__ so they bind to the server's loop
+        self.readers = asyncio.Queue()
+        self.write_lock = asyncio.Lock()
+        self.writer_conn = await open_db()
+        readers = await asyncio.gather(*[open_db() for _ in range(self.size)])
+        for conn in readers:
+            self.readers.put_nowait(conn)
+
+    async def close(self):
+        while self.readers is not None and not self.readers.empty():
+            await self.readers.get_nowait().close()
+        if self.writer_conn is not None:
+            await self.writer_conn.close()
+
+    @asynccontextmanager
+    async def acquire_reader(self):
+        conn = await self.readers.get()
+        try:
+            yield conn
+        finally:
+            self.readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def acquire_writer(self):
+        async with self.write_lock:
+            yield self.writer_conn
+
+db_pool = SqlitePool()
+
+@asynccontextmanager
+async def get_conn():
+    """Borrow a pooled reader connection for the duration of the block."""
+    async with db_pool.acquire_reader() as conn:
+        yield conn
+
+async def query_db(query, args=(), one=False):
+    async with get_conn() as conn:
+        rv = await conn.execute_fetchall(query, args)
+    return (rv[0] if rv else None) if one else rv
+
+# Writer connection of the transaction open in the current task, if any
+current_tx: ContextVar = ContextVar("current_tx", default=None)
+
+@asynccontextmanager
+async def transaction():
+    """Group writes into a single BEGIN IMMEDIATE ... COMMIT on the writer."""
+    async with db_pool.acquire_writer() as conn:
+        await conn.execute("BEGIN IMMEDIATE")
+        token = current_tx.set(conn)
+        try:
+            yield conn
+        except BaseException:
+            await conn.rollback()
+            raise
+        else:
+            await conn.commit()
+        finally:
+            current_tx.reset(token)
+
+async def execute_db(query, args=()):
+    conn = current_tx.get()
+    if conn is not None:
+        async with conn.execute(query, args) as cur:
+            return cur.lastrowid
+    async with db_pool.acquire_writer() as conn:
+        async with conn.execute(query, args) as cur:
+            lastrowid = cur.lastrowid
+        await conn.commit()
+    return lastrowid
+
+async def execute_returning(query, args=()):
+    """Run a write with a RETURNING clause and fetch the rows it emits."""
+    conn = current_tx.get()
+    if conn is not None:
+        return await conn.execute_fetchall(query, args)
+    async with db_pool.acquire_writer() as conn:
+        rv = await conn.execute_fetchall(query, args)
+        await conn.commit()
+    return rv
@@ -1,10 +1,59 @@
+import fcntl
 import sqlite3
 import json
 
-def init_db():
-    conn = sqlite3.connect('sales.db')
-    cursor = conn.cursor()
-    
+DB_PATH = 'sales.db'
+# Bump whenever bootstrap() changes so existing databases pick it up once
+SCHEMA_VERSION = 4
+
+FTS_TABLES = {
+    'customers': ('name', 'company', 'notes'),
+    'knowledge_base': ('entity_name', 'relation', 'target_entity', 'additional_info'),
+}
+
+def add_column(cursor, table, column, decl):
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+
+def fts5_available(cursor):
+    cursor.execute('PRAGMA compile_options')
+    return 'ENABLE_FTS5' in [row[0] for row in cursor.fetchall()]
+
+def create_fts_table(cursor, table, columns):
+    fts = f'{table}_fts'
+    cursor.execute('SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?', ('table', fts))
+    exists = cursor.fetchone() is not None
+
+    cols = ', '.join(columns)
+    new_cols = ', '.join(f'new.{c}' for c in columns)
+    old_cols = ', '.join(f'old.{c}' for c in columns)
+    cursor.execute(f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {fts}
+    USING fts5({cols}, content='{table}', content_rowid='id', tokenize='unicode61')
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON {table} BEGIN
+        INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+        INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+    END
+    ''')
+
+    # Backfill rows that existed before the FTS table was introduced
+    if not exists:
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+def bootstrap(cursor):
     # Create users table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS users (
@@ -45,12 +94,51 @@ def init_db():
         FOREIGN KEY (user_id) REFERENCES users (id)
     )
     ''')
+
+    # Semantic cache of chat answers, namespaced per user and system prompt
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS chat_cache (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        prompt_hash TEXT NOT NULL,
+        embedding BLOB NOT NULL,
+        last_embedding BLOB,
+        response TEXT NOT NULL,
+        category TEXT NOT NULL DEFAULT 'semi_dynamic',
+        ttl_seconds REAL NOT NULL DEFAULT 3600,
+        created_at REAL NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    ''')
+    # chat_cache tables from schema version 2 predate the adaptive TTL columns
+    add_column(cursor, 'chat_cache', 'category', "TEXT NOT NULL DEFAULT 'semi_dynamic'")
+    add_column(cursor, 'chat_cache', 'ttl_seconds', 'REAL NOT NULL DEFAULT 3600')
+    # Version 4 also matches on the last user message alone; older rows can't, so drop them
+    cursor.execute('PRAGMA table_info(chat_cache)')
+    if 'last_embedding' not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute('DELETE FROM chat_cache')
+        cursor.execute('ALTER TABLE chat_cache ADD COLUMN last_embedding BLOB')
+
+    # Indexes for the per-user lookups made by the chat tools
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_customers_user ON customers(user_id, id)')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_customers_user_followup
+    ON customers(user_id, next_follow_up) WHERE next_follow_up IS NOT NULL
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_kb_user ON knowledge_base(user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_cache_lookup ON chat_cache(user_id, prompt_hash, created_at)')
+
+    # Full-text indexes mirroring the searchable columns (external content);
+    # builds without FTS5 fall back to LIKE scans in the app
+    if fts5_available(cursor):
+        for table, columns in FTS_TABLES.items():
+            create_fts_table(cursor, table, columns)
     
     # Insert mock user if empty
     cursor.execute('SELECT COUNT(*) FROM users')
     if cursor.fetchone()[0] == 0:
-        # Password is 'password123' (pbkdf2_sha256)
-        hashed_pw = "$pbkdf2-sha256$29000$rTXm3DtnrLU2BuAcA2DMeQ$UoNETCG4zc5Wa0OCmlKCiDLMBTHB8cAn9CXBJfx4vG8"
+        # Password is 'password123' (argon2id, t=2, m=65536, p=2)
+        hashed_pw = "$argon2id$v=19$m=65536,t=2,p=2$y/nfm/N+r/X+/z8nxHivdQ$ikfC9yFvegg/TtY9kBjlONsKvS3awQeTk+XEi8k6iUQ"
         cursor.execute('INSERT INTO users (username, hashed_password) VALUES (?, ?)', ('demo', hashed_pw))
     
     # Get the user id
@@ -83,9 +171,25 @@ def init_db():
         INSERT INTO knowledge_base (user_id, entity_name, relation, target_entity, additional_info)
         VALUES (?, ?, ?, ?, ?)
         ''', knowledge)
-        
-    conn.commit()
-    conn.close()
+
+    # Refresh planner statistics so the new indexes get picked up
+    cursor.execute('ANALYZE')
+
+def init_db():
+    # Serialize concurrent workers; only the first one does any work
+    with open(DB_PATH + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+                return
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN')
+                bootstrap(cursor)
+                cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        finally:
+            conn.close()
 
 if __name__ == '__main__':
     init_db()
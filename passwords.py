@@ -0,0 +1,17 @@
+from passlib.hash import argon2, pbkdf2_sha256
+
+# Kept apart from app.py so HASH_POOL's spawned processes import only this
+# (serve.py is the script entry point for the same reason)
+
+# Bound handler, skipping CryptContext's per-call scheme resolution
+password_hasher = argon2.using(time_cost=2, memory_cost=64 * 1024, parallelism=2)
+LEGACY_HASH_PREFIX = "$pbkdf2-sha256$"
+
+def hash_password(password):
+    return password_hasher.hash(password)
+
+def check_password(plain_password, hashed_password):
+    # Accounts created before the argon2 switch still carry pbkdf2_sha256 hashes
+    if hashed_password.startswith(LEGACY_HASH_PREFIX):
+        return pbkdf2_sha256.verify(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)
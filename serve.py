@@ -0,0 +1,18 @@
+import os
+import uvicorn
+
+# Entry point for `python3 serve.py`. Kept out of app.py because multiprocessing's
+# spawn re-imports __main__ in every child, and HASH_POOL's processes should load
+# passwords.py, not the whole app.
+if __name__ == "__main__":
+    # Exported so each worker sees the count (shared_cache warns if > 1 without Redis)
+    os.environ.setdefault("WEB_CONCURRENCY", str(os.cpu_count() or 1))
+    # Workers need an import string; in-memory caches are per worker
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.environ["WEB_CONCURRENCY"]),
+    )
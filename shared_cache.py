@@ -0,0 +1,128 @@
+import os
+import time
+import logging
+import orjson
+import redis.asyncio as aioredis
+from cachetools import TLRUCache
+from typing import Any, Optional, Tuple
+
+KEY_PREFIX = "salesagents:"
+logger = logging.getLogger(__name__)
+
+def deadline_cache(maxsize: int):
+    # Values are (value, monotonic deadline)
+    return TLRUCache(maxsize=maxsize, ttu=lambda key, value, now: value[1], timer=time.monotonic)
+
+class LocalStore:
+    """Per-process fallback: TLRUCaches whose entries carry their own deadline.
+
+    Counters get their own cache so a flood of cached values (chat replies, random
+    tokens) can't evict rate-limit counters and reset the throttle.
+    """
+
+    def __init__(self, maxsize: int = 30_000, counter_maxsize: int = 10_000):
+        self.entries = deadline_cache(maxsize)
+        self.counters = deadline_cache(counter_maxsize)
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        return None if entry is None else entry[0]
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self.entries[key] = (value, time.monotonic() + ttl)
+
+    async def delete(self, key: str):
+        self.entries.pop(key, None)
+        self.counters.pop(key, None)
+
+    async def incr(self, key: str, window: int):
+        count, deadline = self.counters.get(key, (0, time.monotonic() + window))
+        self.counters[key] = (count + 1, deadline)
+        return count + 1
+
+    async def counter(self, key: str):
+        count, deadline = self.counters.get(key, (0, time.monotonic()))
+        return count, max(0.0, deadline - time.monotonic())
+
+    async def close(self):
+        self.entries.clear()
+        self.counters.clear()
+
+class RedisStore:
+    """Redis-backed store, so every worker shares hits and rate-limit counters."""
+
+    def __init__(self, url: str):
+        self.redis = aioredis.from_url(url)
+
+    async def get(self, key: str):
+        raw = await self.redis.get(KEY_PREFIX + key)
+        return None if raw is None else orjson.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self.redis.set(KEY_PREFIX + key, orjson.dumps(value), px=max(1, int(ttl * 1000)))
+
+    async def delete(self, key: str):
+        await self.redis.delete(KEY_PREFIX + key)
+
+    async def incr(self, key: str, window: int):
+        # SET NX starts the window on the first failure; INCR keeps the expiry
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(KEY_PREFIX + key, 0, ex=window, nx=True)
+            pipe.incr(KEY_PREFIX + key)
+            _, count = await pipe.execute()
+        return count
+
+    async def counter(self, key: str):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.get(KEY_PREFIX + key)
+            pipe.pttl(KEY_PREFIX + key)
+            raw, pttl = await pipe.execute()
+        return int(raw or 0), max(0, pttl) / 1000
+
+    async def close(self):
+        await self.redis.aclose()
+
+class SharedCache:
+    """TTL key/value store used by caches that must agree across workers.
+
+    Uses Redis when REDIS_URL is set, otherwise falls back to process memory.
+    """
+
+    def __init__(self):
+        self.backend = LocalStore()
+
+    async def open(self):
+        # Read at startup for the same reason as SqlitePool.open reads DB_POOL_SIZE
+        url = os.getenv("REDIS_URL")
+        if url:
+            backend = RedisStore(url)
+            await backend.redis.ping()
+            self.backend = backend
+        elif int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+            logger.warning(
+                "REDIS_URL is not set but WEB_CONCURRENCY > 1: login throttling, "
+                "token and reply caches are per worker"
+            )
+
+    async def close(self):
+        await self.backend.close()
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await self.backend.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        if ttl > 0:
+            await self.backend.set(key, value, ttl)
+
+    async def delete(self, key: str):
+        await self.backend.delete(key)
+
+    async def incr(self, key: str, window: int) -> int:
+        """Bump a counter that resets `window` seconds after its first increment."""
+        return await self.backend.incr(key, window)
+
+    async def counter(self, key: str) -> Tuple[int, float]:
+        """A counter's value and the seconds left until it resets."""
+        return await self.backend.counter(key)
+
+shared_cache = SharedCache()
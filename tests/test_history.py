@@ -0,0 +1,40 @@
+import asyncio
+
+import app
+
+
+def conversation(*contents):
+    roles = ("user", "assistant")
+    return [{"role": roles[i % 2], "content": c} for i, c in enumerate(contents)]
+
+
+def test_short_history_is_kept():
+    assert app.history_cut(conversation("hi", "hello")) == 0
+
+
+def test_single_long_message_is_not_summarized():
+    history = conversation("x" * (app.HISTORY_MAX_CHARS + 1000))
+    assert app.history_cut(history) == 0
+
+    async def fail(older):
+        raise AssertionError("summarize called")
+
+    app_summarize, app.summarize = app.summarize, fail
+    try:
+        messages = [{"role": "system", "content": "sys"}] + history
+        assert asyncio.run(app.compact_history(messages)) == messages
+    finally:
+        app.summarize = app_summarize
+
+
+def test_few_long_messages_are_not_summarized():
+    history = conversation(*["x" * 2000] * (app.HISTORY_KEEP_RECENT - 1))
+    assert app.history_cut(history) == 0
+
+
+def test_long_history_keeps_a_user_turn_first():
+    history = conversation(*[f"m{i}" for i in range(app.HISTORY_MAX_MESSAGES + 3)])
+    cut = app.history_cut(history)
+    assert cut > 0
+    assert history[cut]["role"] == "user"
+    assert len(history) - cut >= app.HISTORY_KEEP_RECENT